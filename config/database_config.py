@@ -6,10 +6,11 @@ This module provides centralized configuration management for database
 connections, ETL settings, and system parameters.
 """
 
+import functools
 import os
 import sqlite3
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 
@@ -23,6 +24,10 @@ class DatabaseConfig:
     enable_foreign_keys: bool = True
     enable_wal_mode: bool = True
     max_retries: int = 3
+    page_size: int = 8192                 # Only takes effect on a new database
+    mmap_size: int = 268435456            # 256MB memory-mapped I/O
+    wal_autocheckpoint: int = 10000       # Pages between automatic checkpoints
+    journal_size_limit: int = 67108864    # 64MB
 
 @dataclass
 class ETLConfig:
@@ -34,53 +39,107 @@ class ETLConfig:
     log_level: str = "INFO"
     backup_before_etl: bool = True
     
+class _ConnPool:
+    """Memoizes one read-write and one read-only connection per database path"""
+    
+    def __init__(self):
+        self._connections: Dict[Tuple[str, bool], sqlite3.Connection] = {}
+    
+    def get(
+        self,
+        db_path: str,
+        read_only: bool,
+        factory: Callable[[str, bool], sqlite3.Connection]
+    ) -> sqlite3.Connection:
+        """Return the pooled connection, opening a new one if missing or closed"""
+        key = (db_path, read_only)
+        conn = self._connections.get(key)
+        if conn is not None:
+            try:
+                conn.total_changes  # Raises if a caller closed the handle
+                return conn
+            except sqlite3.ProgrammingError:
+                pass
+        
+        conn = factory(db_path, read_only)
+        self._connections[key] = conn
+        return conn
+    
+    def close_all(self):
+        """Close every pooled connection, refreshing planner statistics on writers"""
+        for (_, read_only), conn in self._connections.items():
+            if not read_only:
+                try:
+                    conn.execute("PRAGMA main.optimize")
+                except sqlite3.ProgrammingError:
+                    pass  # Already closed by the caller
+            conn.close()
+        self._connections.clear()
+
 class ProcurementETLConfig:
     """Main configuration manager for the Procurement ETL system"""
     
     def __init__(self, config_file: Optional[str] = None):
         self.config_file = config_file
+        self._pool = _ConnPool()
         self._load_configuration()
     
     def _load_configuration(self):
         """Load configuration from environment variables or config file"""
         
+        # Snapshot the environment once and parse values through cached helpers
+        env = os.environ.copy()
+        
+        def _str(key: str, default: str) -> str:
+            return env.get(key, default)
+        
+        def _int(key: str, default: str) -> int:
+            return self._parse_int(env.get(key, default))
+        
+        def _bool(key: str, default: str) -> bool:
+            return self._parse_bool(env.get(key, default))
+        
         # Database paths - default to development environment
-        db_base_path = os.getenv('PROCUREMENT_DB_PATH', '/Users/myownip/db_dev')
+        db_base_path = _str('PROCUREMENT_DB_PATH', '/Users/myownip/db_dev')
         
         self.database = DatabaseConfig(
-            operational_db_path=os.getenv(
-                'OPERATIONAL_DB_PATH', 
+            operational_db_path=_str(
+                'OPERATIONAL_DB_PATH',
                 f'{db_base_path}/procurement_operational.db'
             ),
-            analytics_db_path=os.getenv(
-                'ANALYTICS_DB_PATH', 
+            analytics_db_path=_str(
+                'ANALYTICS_DB_PATH',
                 f'{db_base_path}/procurement_analytics.db'
             ),
-            backup_db_path=os.getenv(
-                'BACKUP_DB_PATH', 
+            backup_db_path=_str(
+                'BACKUP_DB_PATH',
                 '/Users/myownip/db_backups/suppliers_backup_20250509_082655.db'
             ),
-            connection_timeout=int(os.getenv('DB_CONNECTION_TIMEOUT', '30')),
-            enable_foreign_keys=os.getenv('DB_ENABLE_FK', 'true').lower() == 'true',
-            enable_wal_mode=os.getenv('DB_ENABLE_WAL', 'true').lower() == 'true'
+            connection_timeout=_int('DB_CONNECTION_TIMEOUT', '30'),
+            enable_foreign_keys=_bool('DB_ENABLE_FK', 'true'),
+            enable_wal_mode=_bool('DB_ENABLE_WAL', 'true'),
+            page_size=_int('DB_PAGE_SIZE', '8192'),
+            mmap_size=_int('DB_MMAP_SIZE', '268435456'),
+            wal_autocheckpoint=_int('DB_WAL_AUTOCHECKPOINT', '10000'),
+            journal_size_limit=_int('DB_JOURNAL_SIZE_LIMIT', '67108864')
         )
         
         self.etl = ETLConfig(
-            batch_size=int(os.getenv('ETL_BATCH_SIZE', '1000')),
-            max_parallel_jobs=int(os.getenv('ETL_MAX_JOBS', '4')),
-            enable_data_validation=os.getenv('ETL_VALIDATE_DATA', 'true').lower() == 'true',
-            auto_create_indexes=os.getenv('ETL_AUTO_INDEX', 'true').lower() == 'true',
-            log_level=os.getenv('ETL_LOG_LEVEL', 'INFO'),
-            backup_before_etl=os.getenv('ETL_BACKUP_FIRST', 'true').lower() == 'true'
+            batch_size=_int('ETL_BATCH_SIZE', '1000'),
+            max_parallel_jobs=_int('ETL_MAX_JOBS', '4'),
+            enable_data_validation=_bool('ETL_VALIDATE_DATA', 'true'),
+            auto_create_indexes=_bool('ETL_AUTO_INDEX', 'true'),
+            log_level=_str('ETL_LOG_LEVEL', 'INFO'),
+            backup_before_etl=_bool('ETL_BACKUP_FIRST', 'true')
         )
         
         # System settings
         self.system = {
-            'temp_dir': os.getenv('TEMP_DIR', '/tmp/procurement_etl'),
-            'log_dir': os.getenv('LOG_DIR', './logs'),
-            'max_log_files': int(os.getenv('MAX_LOG_FILES', '10')),
-            'environment': os.getenv('ENVIRONMENT', 'development'),
-            'debug_mode': os.getenv('DEBUG_MODE', 'false').lower() == 'true'
+            'temp_dir': _str('TEMP_DIR', '/tmp/procurement_etl'),
+            'log_dir': _str('LOG_DIR', './logs'),
+            'max_log_files': _int('MAX_LOG_FILES', '10'),
+            'environment': _str('ENVIRONMENT', 'development'),
+            'debug_mode': _bool('DEBUG_MODE', 'false')
         }
         
         # MCP Server settings
@@ -95,6 +154,18 @@ class ProcurementETLConfig:
         # Ensure directories exist
         self._ensure_directories()
     
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _parse_int(value: str) -> int:
+        """Parse an integer setting, memoized per raw string"""
+        return int(value)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _parse_bool(value: str) -> bool:
+        """Parse a 'true'/'false' setting, memoized per raw string"""
+        return value.lower() == 'true'
+    
     def _ensure_directories(self):
         """Create necessary directories if they don't exist"""
         directories = [
@@ -107,39 +178,62 @@ class ProcurementETLConfig:
         for directory in directories:
             Path(directory).mkdir(parents=True, exist_ok=True)
     
-    def get_operational_connection(self) -> sqlite3.Connection:
-        """Get connection to operational database"""
-        return self._get_connection(self.database.operational_db_path)
+    def get_operational_connection(self, read_only: bool = False) -> sqlite3.Connection:
+        """Get pooled connection to operational database"""
+        return self._get_connection(self.database.operational_db_path, read_only)
     
-    def get_analytics_connection(self) -> sqlite3.Connection:
-        """Get connection to analytics database"""
-        return self._get_connection(self.database.analytics_db_path)
+    def get_analytics_connection(self, read_only: bool = False) -> sqlite3.Connection:
+        """Get pooled connection to analytics database"""
+        return self._get_connection(self.database.analytics_db_path, read_only)
     
-    def get_backup_connection(self) -> Optional[sqlite3.Connection]:
-        """Get connection to backup database if available"""
+    def get_backup_connection(self, read_only: bool = False) -> Optional[sqlite3.Connection]:
+        """Get pooled connection to backup database if available"""
         if self.database.backup_db_path and os.path.exists(self.database.backup_db_path):
-            return self._get_connection(self.database.backup_db_path)
+            return self._get_connection(self.database.backup_db_path, read_only)
         return None
     
-    def _get_connection(self, db_path: str) -> sqlite3.Connection:
+    def close_connections(self):
+        """Close all pooled database connections"""
+        self._pool.close_all()
+    
+    def _get_connection(self, db_path: str, read_only: bool = False) -> sqlite3.Connection:
+        """Get pooled SQLite connection, opening it on first use"""
+        return self._pool.get(db_path, read_only, self._open_connection)
+    
+    def _open_connection(self, db_path: str, read_only: bool = False) -> sqlite3.Connection:
         """Create optimized SQLite connection"""
-        conn = sqlite3.connect(
-            db_path, 
-            timeout=self.database.connection_timeout
-        )
+        if read_only:
+            conn = sqlite3.connect(
+                f'{Path(db_path).absolute().as_uri()}?mode=ro',
+                uri=True,
+                timeout=self.database.connection_timeout
+            )
+        else:
+            conn = sqlite3.connect(
+                db_path, 
+                timeout=self.database.connection_timeout
+            )
         
         # Enable foreign keys if configured
         if self.database.enable_foreign_keys:
             conn.execute('PRAGMA foreign_keys = ON')
         
-        # Enable WAL mode for better concurrency
-        if self.database.enable_wal_mode:
-            conn.execute('PRAGMA journal_mode = WAL')
+        if not read_only:
+            # Page size must be set before WAL mode or the first table is created
+            conn.execute(f'PRAGMA page_size = {self.database.page_size:d}')
+            
+            # Enable WAL mode for better concurrency
+            if self.database.enable_wal_mode:
+                conn.execute('PRAGMA journal_mode = WAL')
+                conn.execute(f'PRAGMA wal_autocheckpoint = {self.database.wal_autocheckpoint:d}')
+            
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute(f'PRAGMA journal_size_limit = {self.database.journal_size_limit:d}')
         
         # Performance optimizations
-        conn.execute('PRAGMA synchronous = NORMAL')
         conn.execute('PRAGMA cache_size = -64000')  # 64MB cache
         conn.execute('PRAGMA temp_store = MEMORY')
+        conn.execute(f'PRAGMA mmap_size = {self.database.mmap_size:d}')
         
         return conn
     
@@ -158,17 +252,15 @@ class ProcurementETLConfig:
         
         # Test database connections
         try:
-            conn = self.get_operational_connection()
+            conn = self.get_operational_connection(read_only=True)
             conn.execute('SELECT 1')
-            conn.close()
             results['operational_db_accessible'] = True
         except Exception:
             results['operational_db_accessible'] = False
         
         try:
-            conn = self.get_analytics_connection()
+            conn = self.get_analytics_connection(read_only=True)
             conn.execute('SELECT 1')
-            conn.close()
             results['analytics_db_accessible'] = True
         except Exception:
             results['analytics_db_accessible'] = False
@@ -199,37 +291,36 @@ class ProcurementETLConfig:
         }
     
     def print_summary(self):
-        """Print configuration summary"""
-        print("\n" + "=" * 60)
-        print("📋 PROCUREMENT ETL CONFIGURATION SUMMARY")
-        print("=" * 60)
-        
-        print(f"\n🗃️  Database Configuration:")
-        print(f"   Operational: {self.database.operational_db_path}")
-        print(f"   Analytics:   {self.database.analytics_db_path}")
-        print(f"   Backup:      {self.database.backup_db_path or 'None'}")
-        
-        print(f"\n⚙️  ETL Configuration:")
-        print(f"   Batch Size:      {self.etl.batch_size:,}")
-        print(f"   Max Jobs:        {self.etl.max_parallel_jobs}")
-        print(f"   Validation:      {self.etl.enable_data_validation}")
-        print(f"   Auto Indexes:    {self.etl.auto_create_indexes}")
-        print(f"   Log Level:       {self.etl.log_level}")
-        
-        print(f"\n🔧 System Configuration:")
-        print(f"   Environment:     {self.system['environment']}")
-        print(f"   Debug Mode:      {self.system['debug_mode']}")
-        print(f"   Temp Directory:  {self.system['temp_dir']}")
-        print(f"   Log Directory:   {self.system['log_dir']}")
-        
-        # Validation results
+        """Print configuration summary as a single write"""
         validation = self.validate_configuration()
-        print(f"\n✅ Validation Results:")
-        for check, result in validation.items():
-            status = "✅ PASS" if result else "❌ FAIL"
-            print(f"   {check.replace('_', ' ').title()}: {status}")
+        validation_lines = "\n".join(
+            f"   {check.replace('_', ' ').title()}: {'✅ PASS' if result else '❌ FAIL'}"
+            for check, result in validation.items()
+        )
         
-        print("\n" + "=" * 60)
+        print(
+            f"\n{'=' * 60}\n"
+            f"📋 PROCUREMENT ETL CONFIGURATION SUMMARY\n"
+            f"{'=' * 60}\n"
+            f"\n🗃️  Database Configuration:\n"
+            f"   Operational: {self.database.operational_db_path}\n"
+            f"   Analytics:   {self.database.analytics_db_path}\n"
+            f"   Backup:      {self.database.backup_db_path or 'None'}\n"
+            f"\n⚙️  ETL Configuration:\n"
+            f"   Batch Size:      {self.etl.batch_size:,}\n"
+            f"   Max Jobs:        {self.etl.max_parallel_jobs}\n"
+            f"   Validation:      {self.etl.enable_data_validation}\n"
+            f"   Auto Indexes:    {self.etl.auto_create_indexes}\n"
+            f"   Log Level:       {self.etl.log_level}\n"
+            f"\n🔧 System Configuration:\n"
+            f"   Environment:     {self.system['environment']}\n"
+            f"   Debug Mode:      {self.system['debug_mode']}\n"
+            f"   Temp Directory:  {self.system['temp_dir']}\n"
+            f"   Log Directory:   {self.system['log_dir']}\n"
+            f"\n✅ Validation Results:\n"
+            f"{validation_lines}\n"
+            f"\n{'=' * 60}"
+        )
 
 # Global configuration instance
 config = ProcurementETLConfig()
@@ -243,13 +334,13 @@ def get_analytics_db() -> str:
     """Get path to analytics database"""
     return config.database.analytics_db_path
 
-def get_operational_connection() -> sqlite3.Connection:
-    """Get connection to operational database"""
-    return config.get_operational_connection()
+def get_operational_connection(read_only: bool = False) -> sqlite3.Connection:
+    """Get pooled connection to operational database"""
+    return config.get_operational_connection(read_only)
 
-def get_analytics_connection() -> sqlite3.Connection:
-    """Get connection to analytics database"""
-    return config.get_analytics_connection()
+def get_analytics_connection(read_only: bool = False) -> sqlite3.Connection:
+    """Get pooled connection to analytics database"""
+    return config.get_analytics_connection(read_only)
 
 # Example usage and testing
 if __name__ == "__main__":
@@ -262,19 +353,18 @@ if __name__ == "__main__":
     print("\n🔍 Testing Database Connections...")
     
     try:
-        op_conn = get_operational_connection()
+        op_conn = get_operational_connection(read_only=True)
         result = op_conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'").fetchone()
         print(f"   Operational DB: ✅ {result[0]} tables found")
-        op_conn.close()
     except Exception as e:
         print(f"   Operational DB: ❌ Error - {e}")
     
     try:
-        an_conn = get_analytics_connection()
+        an_conn = get_analytics_connection(read_only=True)
         result = an_conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'").fetchone()
         print(f"   Analytics DB:   ✅ {result[0]} tables found")
-        an_conn.close()
     except Exception as e:
         print(f"   Analytics DB:   ❌ Error - {e}")
     
+    config.close_connections()
     print("\n🎯 Configuration test complete!")
@@ -1,45 +1,154 @@
+import logging
 import sqlite3
 
+from create_analytics_db import create_partition, index_partition, list_partitions, upgrade_schema
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
 # Paths to databases
 backup_db_path = "/Users/myownip/db_backups/suppliers_backup_20250509_082655.db"
 analytics_db_path = "/Users/myownip/db_dev/procurement_analytics.db"
 
-# Connect to analytics database
+# Connect to analytics database; transactions are managed explicitly below
 analytics_conn = sqlite3.connect(analytics_db_path)
+analytics_conn.isolation_level = None
+analytics_conn.execute("PRAGMA foreign_keys = ON")
+
+# STAR tables receiving the copy
+star_tables = ['dim_vendors', 'dim_commodities', 'dim_time', 'fact_spend_analytics']
 
 # Attach backup database as source
-analytics_conn.execute(f"ATTACH DATABASE '{backup_db_path}' AS source")
+analytics_conn.execute("ATTACH DATABASE ? AS source", (backup_db_path,))
 
 try:
-    # Copy all STAR schema data from backup
-    print("📊 Copying dim_vendors...")
-    analytics_conn.execute("INSERT INTO main.dim_vendors SELECT * FROM source.dim_vendors")
+    # Take the write lock up front so the whole copy commits once
+    analytics_conn.execute("BEGIN IMMEDIATE")
+    analytics_conn.execute("PRAGMA defer_foreign_keys = ON")  # Check FKs once at COMMIT
+    upgrade_schema(analytics_conn)  # Partition a pre-partitioning fact table first
     
-    print("📊 Copying dim_commodities...")
-    analytics_conn.execute("INSERT INTO main.dim_commodities SELECT * FROM source.dim_commodities") 
+    # Drop secondary indexes so the bulk load only maintains the primary keys
+    index_tables = star_tables + list_partitions(analytics_conn)
+    placeholders = ", ".join("?" for _ in index_tables)
+    secondary_indexes = analytics_conn.execute(f"""
+        SELECT name, sql FROM main.sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    """, index_tables).fetchall()
+    for index_name, _ in secondary_indexes:
+        analytics_conn.execute(f'DROP INDEX IF EXISTS main."{index_name}"')
     
-    print("📊 Copying dim_time...")
-    analytics_conn.execute("INSERT INTO main.dim_time SELECT * FROM source.dim_time")
+    # Copy all STAR schema data from backup in primary key order
+    logger.info("📊 Copying dim_vendors...")
+    analytics_conn.execute("INSERT INTO main.dim_vendors SELECT * FROM source.dim_vendors ORDER BY vendor_key")
     
-    print("📊 Copying fact_spend_analytics...")
-    analytics_conn.execute("INSERT INTO main.fact_spend_analytics SELECT * FROM source.fact_spend_analytics")
-
-    analytics_conn.commit()
-    print("✅ All STAR schema data copied successfully!")
+    logger.info("📊 Copying dim_commodities...")
+    analytics_conn.execute("INSERT INTO main.dim_commodities SELECT * FROM source.dim_commodities ORDER BY commodity_key") 
+    
+    # dim_time is a deterministic calendar, so generate it rather than copy it.
+    # The range covers 2009-2035 plus every date the backup's facts reference.
+    logger.info("📊 Generating dim_time...")
+    first_key, last_key = analytics_conn.execute(
+        "SELECT MIN(time_key), MAX(time_key) FROM source.fact_spend_analytics"
+    ).fetchone()
+    first_key = min(first_key or 20090101, 20090101)
+    last_key = max(last_key or 20351231, 20351231)
+    analytics_conn.execute("""
+        WITH RECURSIVE date_series(date_actual) AS (
+            SELECT DATE(printf('%04d-%02d-%02d', :first / 10000, :first / 100 % 100, :first % 100))
+            UNION ALL
+            SELECT DATE(date_actual, '+1 day')
+            FROM date_series
+            WHERE date_actual < DATE(printf('%04d-%02d-%02d', :last / 10000, :last / 100 % 100, :last % 100))
+        )
+        INSERT INTO main.dim_time (
+            time_key, date_actual, year, quarter, month, fiscal_year, fiscal_quarter,
+            month_name, quarter_name, day_of_week, week_of_year
+        )
+        SELECT
+            CAST(STRFTIME('%Y%m%d', date_actual) AS INTEGER),
+            date_actual,
+            CAST(STRFTIME('%Y', date_actual) AS INTEGER),
+            (CAST(STRFTIME('%m', date_actual) AS INTEGER) - 1) / 3 + 1,
+            CAST(STRFTIME('%m', date_actual) AS INTEGER),
+            CAST(STRFTIME('%Y', date_actual) AS INTEGER)
+                + (CAST(STRFTIME('%m', date_actual) AS INTEGER) >= 4),
+            ((CAST(STRFTIME('%m', date_actual) AS INTEGER) + 8) % 12) / 3 + 1,
+            CASE STRFTIME('%m', date_actual)
+                WHEN '01' THEN 'January' WHEN '02' THEN 'February' WHEN '03' THEN 'March'
+                WHEN '04' THEN 'April' WHEN '05' THEN 'May' WHEN '06' THEN 'June'
+                WHEN '07' THEN 'July' WHEN '08' THEN 'August' WHEN '09' THEN 'September'
+                WHEN '10' THEN 'October' WHEN '11' THEN 'November' WHEN '12' THEN 'December'
+            END,
+            'Q' || ((CAST(STRFTIME('%m', date_actual) AS INTEGER) - 1) / 3 + 1),
+            CASE STRFTIME('%w', date_actual)
+                WHEN '0' THEN 'Sunday' WHEN '1' THEN 'Monday' WHEN '2' THEN 'Tuesday'
+                WHEN '3' THEN 'Wednesday' WHEN '4' THEN 'Thursday' WHEN '5' THEN 'Friday'
+                WHEN '6' THEN 'Saturday'
+            END,
+            CAST(STRFTIME('%W', date_actual) AS INTEGER)
+        FROM date_series
+    """, {'first': first_key, 'last': last_key})
+    
+    logger.info("📊 Copying fact_spend_analytics...")
+    
+    # Partitions are keyed by time_key, so undated facts have nowhere to go
+    undated = analytics_conn.execute(
+        "SELECT COUNT(*) FROM source.fact_spend_analytics WHERE time_key IS NULL"
+    ).fetchone()[0]
+    if undated:
+        raise RuntimeError(
+            f"{undated} backup fact_spend_analytics rows have no time_key; fix them before copying"
+        )
+    
+    # Stage the source facts once, then route each month into its partition
+    analytics_conn.execute("CREATE TEMP TABLE fact_stage AS SELECT * FROM source.fact_spend_analytics")
+    analytics_conn.execute("CREATE INDEX temp.idx_fact_stage_time ON fact_stage(time_key)")
+    months = analytics_conn.execute(
+        "SELECT DISTINCT time_key / 100 FROM temp.fact_stage ORDER BY 1"
+    ).fetchall()
+    for (yyyymm,) in months:
+        partition = create_partition(analytics_conn, yyyymm, indexed=False)
+        analytics_conn.execute(
+            f"INSERT INTO main.{partition} SELECT * FROM temp.fact_stage "
+            f"WHERE time_key BETWEEN ? AND ? ORDER BY fact_key",
+            (yyyymm * 100, yyyymm * 100 + 99)
+        )
+    analytics_conn.execute("""
+        INSERT OR REPLACE INTO main.fact_spend_sources (source_transaction_id, time_key)
+        SELECT source_transaction_id, time_key FROM temp.fact_stage
+        WHERE source_transaction_id IS NOT NULL
+        ORDER BY fact_key
+    """)
+    analytics_conn.execute("DROP TABLE temp.fact_stage")
+    
+    # Rebuild each secondary index in a single sorted pass over the loaded data
+    logger.info(f"🔧 Rebuilding {len(secondary_indexes)} indexes...")
+    for _, index_sql in secondary_indexes:
+        analytics_conn.execute(index_sql)
+    for partition in list_partitions(analytics_conn):
+        index_partition(analytics_conn, partition)
+    
+    analytics_conn.execute("COMMIT")
+    logger.info("✅ All STAR schema data copied successfully!")
+    
+    # Refresh planner statistics so the ETL joins pick the dimension indexes
+    analytics_conn.execute("ANALYZE main")
     
     # Verify data was copied
     cursor = analytics_conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
-    tables = cursor.fetchall()
-    print(f"\n📋 Tables in analytics database: {[table[0] for table in tables]}")
+    tables = [table[0] for table in cursor.fetchall()]
     
     # Count records in each table
-    for table_name in ['dim_vendors', 'dim_commodities', 'dim_time', 'fact_spend_analytics']:
+    count_lines = []
+    for table_name in star_tables:
         cursor = analytics_conn.execute(f"SELECT COUNT(*) FROM {table_name}")
         count = cursor.fetchone()[0]
-        print(f"   📊 {table_name}: {count:,} records")
+        count_lines.append(f"   📊 {table_name}: {count:,} records")
+    
+    print(f"\n📋 Tables in analytics database: {tables}\n" + "\n".join(count_lines))
 
 except Exception as e:
-    print(f"❌ Error copying data: {e}")
+    logger.error(f"❌ Error copying data: {e}")
     analytics_conn.rollback()
 
 finally:
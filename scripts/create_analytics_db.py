@@ -1,61 +1,22 @@
+import re
 import sqlite3
 import shutil
 
 # Create the new analytics database at your path
 analytics_db_path = "/Users/myownip/db_dev/procurement_analytics.db"
-analytics_conn = sqlite3.connect(analytics_db_path)
-
-# Create STAR schema structure in new database
-analytics_conn.execute("""
-CREATE TABLE dim_vendors (
-    vendor_key INTEGER PRIMARY KEY,
-    vendor_id TEXT,
-    vendor_name TEXT,
-    vendor_tier TEXT,
-    diversity_classification TEXT,
-    risk_rating TEXT,
-    esg_score REAL,
-    country TEXT,
-    region TEXT,
-    effective_start_date DATE,
-    effective_end_date DATE,
-    is_current_record BOOLEAN
-);
-""")
-
-analytics_conn.execute("""
-CREATE TABLE dim_commodities (
-    commodity_key INTEGER PRIMARY KEY,
-    commodity_id TEXT,
-    commodity_description TEXT,
-    parent_category TEXT,
-    sub_category TEXT,
-    business_criticality TEXT,
-    sourcing_complexity TEXT,
-    category_manager TEXT,
-    effective_start_date DATE,
-    is_current_record BOOLEAN
-);
-""")
-
-analytics_conn.execute("""
-CREATE TABLE dim_time (
-    time_key INTEGER PRIMARY KEY,
-    date_actual DATE,
-    year INTEGER,
-    quarter INTEGER,
-    month INTEGER,
-    fiscal_year INTEGER,
-    fiscal_quarter INTEGER,
-    month_name TEXT,
-    quarter_name TEXT,
-    day_of_week TEXT,
-    week_of_year INTEGER
-);
-""")
 
-analytics_conn.execute("""
-CREATE TABLE fact_spend_analytics (
+# Fact rows are sharded by month (time_key // 100) into fact_spend_YYYYMM tables.
+# fact_spend_analytics is a UNION ALL view over the empty template and every partition.
+FACT_VIEW = "fact_spend_analytics"
+FACT_TEMPLATE = "fact_spend_template"
+FACT_PARTITION_GLOB = "fact_spend_[0-9][0-9][0-9][0-9][0-9][0-9]"
+
+# Partitions only index their own rows, so this table records which time_key each
+# loaded source transaction was filed under; the ETL dedupes against it
+FACT_SOURCES = "fact_spend_sources"
+
+FACT_TABLE_DDL = """
+CREATE TABLE {table} (
     fact_key INTEGER PRIMARY KEY,
     vendor_key INTEGER,
     commodity_key INTEGER,
@@ -73,13 +34,227 @@ CREATE TABLE fact_spend_analytics (
     esg_weighted_spend REAL,
     savings_amount REAL,
     discount_amount REAL,
-    source_transaction_id TEXT,
+    source_transaction_id INTEGER,
     load_date DATE,
     FOREIGN KEY (vendor_key) REFERENCES dim_vendors(vendor_key),
     FOREIGN KEY (commodity_key) REFERENCES dim_commodities(commodity_key),
     FOREIGN KEY (time_key) REFERENCES dim_time(time_key)
 );
-""")
+"""
+
+# Per-partition indexes: ETL anti-join on source_transaction_id, dimension joins
+FACT_INDEX_DDL = [
+    "CREATE INDEX IF NOT EXISTS idx_{table}_src_tx ON {table}(source_transaction_id)",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_vendor_key ON {table}(vendor_key)",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_time_key ON {table}(time_key)",
+]
+
+def partition_name(yyyymm: int) -> str:
+    """Name of the fact partition holding a YYYYMM month"""
+    return f"fact_spend_{yyyymm:06d}"
+
+def list_partitions(conn: sqlite3.Connection) -> list:
+    """Names of all existing fact partitions, oldest first"""
+    rows = conn.execute(
+        "SELECT name FROM main.sqlite_master WHERE type = 'table' AND name GLOB ? ORDER BY name",
+        (FACT_PARTITION_GLOB,)
+    ).fetchall()
+    return [row[0] for row in rows]
+
+def refresh_fact_view(conn: sqlite3.Connection):
+    """Regenerate the fact_spend_analytics view over all partitions"""
+    selects = [f"SELECT * FROM {table}" for table in [FACT_TEMPLATE] + list_partitions(conn)]
+    conn.execute(f"DROP VIEW IF EXISTS main.{FACT_VIEW}")
+    conn.execute(f"CREATE VIEW main.{FACT_VIEW} AS " + " UNION ALL ".join(selects))
+
+def index_partition(conn: sqlite3.Connection, table: str):
+    """Create the secondary indexes of a fact partition"""
+    for ddl in FACT_INDEX_DDL:
+        conn.execute(ddl.format(table=table))
+
+def _table_sql(conn: sqlite3.Connection, table: str):
+    """CREATE statement of a main-schema table, or None if it does not exist"""
+    row = conn.execute(
+        "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row[0] if row else None
+
+def create_partition(conn: sqlite3.Connection, yyyymm: int, indexed: bool = True) -> str:
+    """Create the partition for a month if missing and return its name"""
+    table = partition_name(yyyymm)
+    if _table_sql(conn, table) is None:
+        # Partitions copy the template's definition, constraints included
+        template_sql = _table_sql(conn, FACT_TEMPLATE)
+        conn.execute(template_sql.replace(FACT_TEMPLATE, f"main.{table}", 1))
+        if indexed:
+            index_partition(conn, table)
+        refresh_fact_view(conn)
+    return table
+
+def migrate_fact_table(conn: sqlite3.Connection):
+    """Split a pre-partitioning fact_spend_analytics table into monthly partitions"""
+    legacy_sql = _table_sql(conn, FACT_VIEW)
+    if legacy_sql is None:
+        return
+
+    undated = conn.execute(
+        f"SELECT COUNT(*) FROM main.{FACT_VIEW} WHERE time_key IS NULL"
+    ).fetchone()[0]
+    if undated:
+        raise RuntimeError(
+            f"{undated} {FACT_VIEW} rows have no time_key; fix them before migrating to partitions"
+        )
+
+    legacy_table = "fact_spend_legacy"
+    conn.execute("SAVEPOINT migrate_fact_table")
+    try:
+        # Legacy rename leaves view bodies pointing at fact_spend_analytics,
+        # which becomes the partition view below
+        conn.execute("PRAGMA legacy_alter_table = ON")
+        conn.execute(f"ALTER TABLE main.{FACT_VIEW} RENAME TO {legacy_table}")
+        conn.execute("PRAGMA legacy_alter_table = OFF")
+
+        # The template keeps the old table's columns; source ids become INTEGER
+        # and the column affinity converts the stored text on copy
+        if _table_sql(conn, FACT_TEMPLATE) is None:
+            template_sql = re.sub(
+                r"source_transaction_id\s+TEXT", "source_transaction_id INTEGER", legacy_sql
+            )
+            conn.execute(template_sql.replace(FACT_VIEW, f"main.{FACT_TEMPLATE}", 1))
+
+        months = conn.execute(
+            f"SELECT DISTINCT time_key / 100 FROM main.{legacy_table} ORDER BY 1"
+        ).fetchall()
+        for (yyyymm,) in months:
+            partition = create_partition(conn, yyyymm, indexed=False)
+            conn.execute(
+                f"INSERT INTO main.{partition} SELECT * FROM main.{legacy_table} "
+                f"WHERE time_key BETWEEN ? AND ? ORDER BY fact_key",
+                (yyyymm * 100, yyyymm * 100 + 99)
+            )
+        conn.execute(f"DROP TABLE main.{legacy_table}")
+
+        for partition in list_partitions(conn):
+            index_partition(conn, partition)
+        refresh_fact_view(conn)
+        conn.execute("RELEASE migrate_fact_table")
+    except Exception:
+        conn.execute("PRAGMA legacy_alter_table = OFF")
+        conn.execute("ROLLBACK TO migrate_fact_table")
+        conn.execute("RELEASE migrate_fact_table")
+        raise
+
+def create_schema(analytics_conn: sqlite3.Connection):
+    """Create the STAR schema structure in a new database"""
+    # Larger pages suit bulk ETL loads; must be set before the first table exists
+    analytics_conn.execute("PRAGMA page_size = 8192")
+
+    analytics_conn.execute("""
+    CREATE TABLE dim_vendors (
+        vendor_key INTEGER PRIMARY KEY,
+        vendor_id TEXT,
+        vendor_name TEXT,
+        vendor_tier TEXT,
+        diversity_classification TEXT,
+        risk_rating TEXT,
+        esg_score REAL,
+        country TEXT,
+        region TEXT,
+        effective_start_date DATE,
+        effective_end_date DATE,
+        is_current_record BOOLEAN
+    );
+    """)
+
+    analytics_conn.execute("""
+    CREATE TABLE dim_commodities (
+        commodity_key INTEGER PRIMARY KEY,
+        commodity_id TEXT,
+        commodity_description TEXT,
+        parent_category TEXT,
+        sub_category TEXT,
+        business_criticality TEXT,
+        sourcing_complexity TEXT,
+        category_manager TEXT,
+        effective_start_date DATE,
+        is_current_record BOOLEAN
+    );
+    """)
+
+    analytics_conn.execute("""
+    CREATE TABLE dim_time (
+        time_key INTEGER PRIMARY KEY,
+        date_actual DATE,
+        year INTEGER,
+        quarter INTEGER,
+        month INTEGER,
+        fiscal_year INTEGER,
+        fiscal_quarter INTEGER,
+        month_name TEXT,
+        quarter_name TEXT,
+        day_of_week TEXT,
+        week_of_year INTEGER
+    );
+    """)
+
+    # Fact template defines the partition columns; partitions are created by the ETL
+    analytics_conn.execute(FACT_TABLE_DDL.format(table=FACT_TEMPLATE))
+    refresh_fact_view(analytics_conn)
+
+    upgrade_schema(analytics_conn)
+
+def create_fact_sources(conn: sqlite3.Connection):
+    """Create the loaded-transaction registry, backfilling it from existing facts"""
+    if _table_sql(conn, FACT_SOURCES) is not None:
+        return
+
+    conn.execute(f"""
+    CREATE TABLE main.{FACT_SOURCES} (
+        source_transaction_id INTEGER PRIMARY KEY,
+        time_key INTEGER NOT NULL
+    )
+    """)
+    # Latest load wins for transactions filed in more than one partition
+    conn.execute(f"""
+        INSERT OR REPLACE INTO main.{FACT_SOURCES} (source_transaction_id, time_key)
+        SELECT source_transaction_id, time_key FROM main.{FACT_VIEW}
+        WHERE source_transaction_id IS NOT NULL AND time_key IS NOT NULL
+        ORDER BY load_date, fact_key
+    """)
+    # Drop the other copies; the ETL moves the survivor if its date is stale
+    for partition in list_partitions(conn):
+        conn.execute(f"""
+            DELETE FROM main.{partition}
+            WHERE source_transaction_id IN (
+                SELECT source_transaction_id FROM main.{FACT_SOURCES}
+                WHERE time_key / 100 <> ?
+            )
+        """, (int(partition[-6:]),))
+
+def upgrade_schema(analytics_conn: sqlite3.Connection):
+    """Bring an existing analytics database up to the layout the ETL expects"""
+    migrate_fact_table(analytics_conn)
+    create_fact_sources(analytics_conn)
+
+    # Index backing the ETL upsert (ON CONFLICT target)
+    try:
+        analytics_conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS main.idx_dim_vendors_vendor_id ON dim_vendors(vendor_id)"
+        )
+    except sqlite3.IntegrityError:
+        raise RuntimeError(
+            "dim_vendors has duplicate vendor_id rows; remove them before running the ETL"
+        )
+
+    # Commodity lookup for the fact load join. SQLite index entries carry the rowid,
+    # so this index (like idx_dim_vendors_vendor_id) also covers the *_key column
+    analytics_conn.execute(
+        "CREATE INDEX IF NOT EXISTS main.idx_dim_commodities_commodity_id ON dim_commodities(commodity_id)"
+    )
 
-analytics_conn.close()
-print("✅ Analytics database created successfully!")
+if __name__ == "__main__":
+    analytics_conn = sqlite3.connect(analytics_db_path)
+    create_schema(analytics_conn)
+    analytics_conn.commit()
+    analytics_conn.close()
+    print("✅ Analytics database created successfully!")
@@ -1,26 +1,135 @@
+import logging
 import sqlite3
 from datetime import datetime
 
+try:
+    from create_analytics_db import (
+        create_partition, list_partitions, partition_name, upgrade_schema
+    )
+    from db_connections import ReadOnlyConnections
+except ImportError:  # Imported as scripts.database_etl from the repository root
+    from scripts.create_analytics_db import (
+        create_partition, list_partitions, partition_name, upgrade_schema
+    )
+    from scripts.db_connections import ReadOnlyConnections
+
+logger = logging.getLogger(__name__)
+
 class SeparateDatabaseETL:
-    def __init__(self):
-        self.operational_db = "/Users/myownip/db_dev/procurement_operational.db"
-        self.analytics_db = "/Users/myownip/db_dev/procurement_analytics.db"
+    # Fact rows for operational transactions not loaded yet, or loaded under a
+    # different time_key because their award date changed (loaded_time_key set).
+    # Staged once per run, then routed to the monthly fact partitions. With data
+    # validation the dimensions are LEFT JOINed so unmatched rows can be reported.
+    STAGE_FACTS_QUERY = """
+        SELECT 
+            dv.vendor_key, dc.commodity_key, dt.time_key,
+            st.total_amount AS spend_amount, st.transaction_id AS source_transaction_id,
+            src.time_key AS loaded_time_key
+        FROM operational.spend_transactions st
+        LEFT JOIN main.fact_spend_sources src ON src.source_transaction_id = st.transaction_id
+        {dim_join} main.dim_vendors dv ON st.vendor_id = dv.vendor_id
+        {dim_join} main.dim_commodities dc ON st.commodity_id = dc.commodity_id  
+        {dim_join} main.dim_time dt ON dt.time_key = {time_key}
+        WHERE src.time_key IS NOT {time_key}
+    """
+    
+    # Staged rows for one month, in transaction order. fact_spend_sources already
+    # excludes loaded transactions; the partition anti-join keeps reruns idempotent.
+    # New fact_keys start at YYYYMM * 10^9 so they stay unique across partitions.
+    NEW_FACTS_QUERY = """
+        SELECT 
+            COALESCE(
+                (SELECT MAX(fact_key) FROM main.{partition} WHERE fact_key >= :key_base),
+                :key_base
+            ) + ROW_NUMBER() OVER (ORDER BY s.source_transaction_id),
+            s.vendor_key, s.commodity_key, s.time_key,
+            s.spend_amount, 1, s.source_transaction_id, DATE('now')
+        FROM temp.etl_fact_stage s
+        WHERE s.time_key BETWEEN :first_day AND :last_day
+          AND NOT EXISTS (
+              SELECT 1 FROM main.{partition} f
+              WHERE f.source_transaction_id = s.source_transaction_id
+          )
+        ORDER BY s.source_transaction_id
+    """
+    
+    # Award-date key for operational databases created before the stored
+    # spend_transactions.time_key column (see operational_schema.sql)
+    TIME_KEY_EXPRESSION = "CAST(STRFTIME('%Y%m%d', st.award_date) AS INTEGER)"
+    
+    FACT_COLUMNS = """
+        fact_key, vendor_key, commodity_key, time_key, spend_amount, 
+        transaction_count, source_transaction_id, load_date
+    """
+    
+    def __init__(
+        self,
+        enable_data_validation: bool = True,
+        operational_db: str = "/Users/myownip/db_dev/procurement_operational.db",
+        analytics_db: str = "/Users/myownip/db_dev/procurement_analytics.db"
+    ):
+        self.operational_db = operational_db
+        self.analytics_db = analytics_db
+        self.enable_data_validation = enable_data_validation  # Same default as ETLConfig
+        self._readers = ReadOnlyConnections()
+        
+        # Long-lived analytics connection with the operational database attached,
+        # so page cache stays warm across daily_etl() runs
+        self.analytics_conn = sqlite3.connect(self.analytics_db, cached_statements=512)
+        self.analytics_conn.execute("PRAGMA foreign_keys = ON")
+        self.analytics_conn.execute("ATTACH DATABASE ? AS operational", (self.operational_db,))
+        self.stage_facts_query = self.STAGE_FACTS_QUERY.format(
+            dim_join="LEFT JOIN" if enable_data_validation else "JOIN",
+            time_key=self._operational_time_key()
+        )
+    
+    def _operational_time_key(self):
+        """Return the spend_transactions time_key column, or the award-date expression it stores"""
+        columns = {
+            row[1] for row in
+            self.analytics_conn.execute("PRAGMA operational.table_xinfo(spend_transactions)")
+        }
+        if 'time_key' in columns:
+            return "st.time_key"
+        logger.warning(
+            "⚠️ operational spend_transactions has no time_key column; "
+            "rebuild it from sql/operational_schema.sql to store the award-date key"
+        )
+        return self.TIME_KEY_EXPRESSION
+    
+    def close(self):
+        """Close the ETL connection and the read-only verification connections"""
+        # Only main: optimizing the attached operational schema would write its sqlite_stat1
+        try:
+            self.analytics_conn.execute("PRAGMA main.optimize")
+        except sqlite3.ProgrammingError:
+            pass  # Already closed
+        self.analytics_conn.close()
+        self._readers.close_all()
     
     def daily_etl(self):
         """Daily ETL from operational to analytics"""
-        print(f"🔄 Starting ETL process at {datetime.now()}")
-        
-        # Connect to analytics database
-        analytics_conn = sqlite3.connect(self.analytics_db)
+        logger.info(f"🔄 Starting ETL process at {datetime.now()}")
         
-        # Attach operational database
-        analytics_conn.execute(f"ATTACH DATABASE '{self.operational_db}' AS operational")
+        analytics_conn = self.analytics_conn
         
         try:
+            # One write transaction covers the schema upgrade and the load, so a
+            # failed run rolls back both
+            analytics_conn.execute("BEGIN IMMEDIATE")
+            
+            # Check fact foreign keys once at COMMIT instead of per inserted row;
+            # SQLite resets this after every transaction
+            analytics_conn.execute("PRAGMA defer_foreign_keys = ON")
+            
+            # Bring databases created by older versions up to the partitioned layout
+            # and the indexes the upsert and fact joins rely on
+            upgrade_schema(analytics_conn)
+            
             # ETL new/changed vendors
-            print("📊 Processing new vendors...")
+            logger.info("📊 Processing new vendors...")
             result = analytics_conn.execute("""
-                INSERT OR REPLACE INTO main.dim_vendors (
+                INSERT INTO main.dim_vendors (
                     vendor_id, vendor_name, vendor_tier, diversity_classification,
                     risk_rating, country, effective_start_date, is_current_record
                 )
@@ -28,75 +137,169 @@ class SeparateDatabaseETL:
                     vendor_id, vendor_name, vendor_tier, diversity_classification,
                     'Medium', country, DATE('now'), 1
                 FROM operational.vendors
-                WHERE vendor_id NOT IN (SELECT vendor_id FROM main.dim_vendors WHERE vendor_id IS NOT NULL)
+                WHERE true
+                ON CONFLICT(vendor_id) DO UPDATE SET
+                    vendor_name = excluded.vendor_name,
+                    vendor_tier = excluded.vendor_tier,
+                    diversity_classification = excluded.diversity_classification,
+                    country = excluded.country
+                WHERE dim_vendors.vendor_name IS NOT excluded.vendor_name
+                   OR dim_vendors.vendor_tier IS NOT excluded.vendor_tier
+                   OR dim_vendors.diversity_classification IS NOT excluded.diversity_classification
+                   OR dim_vendors.country IS NOT excluded.country
             """)
-            vendor_updates = analytics_conn.rowcount
-            print(f"   ✅ {vendor_updates} vendors processed")
+            vendor_updates = result.rowcount
+            logger.info(f"   ✅ {vendor_updates} vendors processed")
             
             # ETL new transactions
-            print("📊 Processing new transactions...")
-            result = analytics_conn.execute("""
-                INSERT INTO main.fact_spend_analytics (
-                    vendor_key, commodity_key, time_key, spend_amount, 
-                    transaction_count, source_transaction_id, load_date
-                )
-                SELECT 
-                    dv.vendor_key, dc.commodity_key, dt.time_key,
-                    st.total_amount, 1, CAST(st.transaction_id AS TEXT), DATE('now')
-                FROM operational.spend_transactions st
-                JOIN main.dim_vendors dv ON st.vendor_id = dv.vendor_id
-                JOIN main.dim_commodities dc ON st.commodity_id = dc.commodity_id  
-                JOIN main.dim_time dt ON dt.time_key = CAST(STRFTIME('%Y%m%d', st.award_date) AS INTEGER)
-                WHERE st.transaction_id NOT IN (
-                    SELECT CAST(source_transaction_id AS INTEGER) 
-                    FROM main.fact_spend_analytics 
-                    WHERE source_transaction_id IS NOT NULL
-                )
-            """)
-            transaction_updates = analytics_conn.rowcount
-            print(f"   ✅ {transaction_updates} transactions processed")
+            logger.info("📊 Processing new transactions...")
+            transaction_updates, rejected, changed_partitions = self._load_facts(analytics_conn)
+            if rejected:
+                logger.warning(f"   ⚠️ {rejected} transactions rejected by validation")
+            logger.info(f"   ✅ {transaction_updates} transactions processed")
+            
+            # Refresh planner statistics for the tables this run changed
+            for table in ['dim_vendors'] + changed_partitions:
+                analytics_conn.execute(f"ANALYZE main.{table}")
             
             analytics_conn.commit()
-            print(f"✅ ETL process completed successfully at {datetime.now()}")
+            logger.info(f"✅ ETL process completed successfully at {datetime.now()}")
             
         except Exception as e:
-            print(f"❌ ETL Error: {e}")
+            logger.error(f"❌ ETL Error: {e}")
             analytics_conn.rollback()
-            
-        finally:
-            analytics_conn.close()
+    
+    def _load_facts(self, analytics_conn):
+        """Route new facts into monthly partitions, returning (loaded, rejected, partitions changed)"""
+        analytics_conn.execute("DROP TABLE IF EXISTS temp.etl_fact_stage")
+        analytics_conn.execute(f"CREATE TEMP TABLE etl_fact_stage AS {self.stage_facts_query}")
+        analytics_conn.execute("CREATE INDEX temp.idx_etl_fact_stage_time ON etl_fact_stage(time_key)")
+        
+        rejected = self._reject_invalid_facts(analytics_conn) if self.enable_data_validation else 0
+        changed_partitions = self._remove_moved_facts(analytics_conn)
+        
+        months = analytics_conn.execute(
+            "SELECT DISTINCT time_key / 100 FROM temp.etl_fact_stage ORDER BY 1"
+        ).fetchall()
+        
+        loaded = 0
+        for (yyyymm,) in months:
+            partition = create_partition(analytics_conn, yyyymm)
+            month_loaded = self._load_partition(analytics_conn, partition, yyyymm)
+            loaded += month_loaded
+            if month_loaded:
+                changed_partitions.add(partition)
+        
+        analytics_conn.execute("DROP TABLE temp.etl_fact_stage")
+        return loaded, rejected, sorted(changed_partitions)
+    
+    def _reject_invalid_facts(self, analytics_conn):
+        """Drop staged transactions without a vendor, commodity or date dimension row, returning how many"""
+        total, no_vendor, no_commodity, no_date = analytics_conn.execute("""
+            SELECT COUNT(*), TOTAL(vendor_key IS NULL), TOTAL(commodity_key IS NULL),
+                   TOTAL(time_key IS NULL)
+            FROM temp.etl_fact_stage
+            WHERE vendor_key IS NULL OR commodity_key IS NULL OR time_key IS NULL
+        """).fetchone()
+        if total:
+            logger.warning(
+                f"   ⚠️ Rejected transactions: {int(no_vendor)} unknown vendor, "
+                f"{int(no_commodity)} unknown commodity, {int(no_date)} award date outside dim_time"
+            )
+            analytics_conn.execute("""
+                DELETE FROM temp.etl_fact_stage
+                WHERE vendor_key IS NULL OR commodity_key IS NULL OR time_key IS NULL
+            """)
+        return total
+    
+    def _remove_moved_facts(self, analytics_conn):
+        """Delete facts of staged transactions filed under an old time_key, returning their partitions"""
+        existing = set(list_partitions(analytics_conn))
+        changed = set()
+        months = analytics_conn.execute("""
+            SELECT DISTINCT loaded_time_key / 100 FROM temp.etl_fact_stage
+            WHERE loaded_time_key IS NOT NULL
+        """).fetchall()
+        for (yyyymm,) in months:
+            partition = partition_name(yyyymm)
+            if partition not in existing:
+                continue
+            analytics_conn.execute(f"""
+                DELETE FROM main.{partition}
+                WHERE source_transaction_id IN (
+                    SELECT source_transaction_id FROM temp.etl_fact_stage
+                    WHERE loaded_time_key BETWEEN ? AND ?
+                )
+            """, (yyyymm * 100, yyyymm * 100 + 99))
+            changed.add(partition)
+        
+        analytics_conn.execute("""
+            DELETE FROM main.fact_spend_sources
+            WHERE source_transaction_id IN (
+                SELECT source_transaction_id FROM temp.etl_fact_stage
+                WHERE loaded_time_key IS NOT NULL
+            )
+        """)
+        return changed
+    
+    def _load_partition(self, analytics_conn, partition, yyyymm):
+        """Load one month of new facts into its partition, returning how many were loaded"""
+        params = {
+            'key_base': yyyymm * 10**9,
+            'first_day': yyyymm * 100,
+            'last_day': yyyymm * 100 + 99
+        }
+        result = analytics_conn.execute(
+            f"INSERT INTO main.{partition} ({self.FACT_COLUMNS}) "
+            f"{self.NEW_FACTS_QUERY.format(partition=partition)}",
+            params
+        )
+        
+        # Register the transactions that reached the partition
+        analytics_conn.execute(f"""
+            INSERT OR REPLACE INTO main.fact_spend_sources (source_transaction_id, time_key)
+            SELECT s.source_transaction_id, s.time_key FROM temp.etl_fact_stage s
+            WHERE s.time_key BETWEEN :first_day AND :last_day
+              AND EXISTS (
+                  SELECT 1 FROM main.{partition} f
+                  WHERE f.source_transaction_id = s.source_transaction_id
+              )
+        """, params)
+        return result.rowcount
     
     def verify_separation(self):
         """Verify both databases are working correctly"""
         print("🔍 Verifying database separation...")
         
         # Check operational database
-        op_conn = sqlite3.connect(self.operational_db)
+        op_conn = self._readers.get(self.operational_db)
         op_tables = op_conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
         op_vendor_count = op_conn.execute("SELECT COUNT(*) FROM vendors").fetchone()[0]
         op_transaction_count = op_conn.execute("SELECT COUNT(*) FROM spend_transactions").fetchone()[0]
-        op_conn.close()
         
         # Check analytics database
-        an_conn = sqlite3.connect(self.analytics_db)
+        an_conn = self._readers.get(self.analytics_db)
         an_tables = an_conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
         an_vendor_count = an_conn.execute("SELECT COUNT(*) FROM dim_vendors").fetchone()[0]
         an_fact_count = an_conn.execute("SELECT COUNT(*) FROM fact_spend_analytics").fetchone()[0]
-        an_conn.close()
-        
-        print(f"\n📁 Operational Database:")
-        print(f"   📊 Tables: {len(op_tables)} (includes: vendors, spend_transactions, contracts, etc.)")
-        print(f"   📊 Vendors: {op_vendor_count:,}")
-        print(f"   📊 Transactions: {op_transaction_count:,}")
-        
-        print(f"\n📁 Analytics Database:")
-        print(f"   📊 Tables: {len(an_tables)} (STAR schema: dim_*, fact_*)")
-        print(f"   📊 Dim Vendors: {an_vendor_count:,}")
-        print(f"   📊 Fact Records: {an_fact_count:,}")
         
-        print("\n✅ Database separation verified!")
+        print(
+            f"\n📁 Operational Database:\n"
+            f"   📊 Tables: {len(op_tables)} (includes: vendors, spend_transactions, contracts, etc.)\n"
+            f"   📊 Vendors: {op_vendor_count:,}\n"
+            f"   📊 Transactions: {op_transaction_count:,}\n"
+            f"\n📁 Analytics Database:\n"
+            f"   📊 Tables: {len(an_tables)} (STAR schema: dim_*, fact_*)\n"
+            f"   📊 Dim Vendors: {an_vendor_count:,}\n"
+            f"   📊 Fact Records: {an_fact_count:,}\n"
+            f"\n✅ Database separation verified!"
+        )
 
 # Run verification
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     etl = SeparateDatabaseETL()
-    etl.verify_separation()
+    try:
+        etl.verify_separation()
+    finally:
+        etl.close()
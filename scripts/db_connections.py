@@ -0,0 +1,35 @@
+"""
+Read-only SQLite connection helpers shared by the ETL scripts.
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import Dict
+
+def read_only_uri(db_path: str) -> str:
+    """Build a read-only SQLite URI for a database file"""
+    return f"{Path(db_path).absolute().as_uri()}?mode=ro"
+
+def connect_read_only(db_path: str, **kwargs) -> sqlite3.Connection:
+    """Open a read-only connection to the database"""
+    return sqlite3.connect(read_only_uri(db_path), uri=True, **kwargs)
+
+class ReadOnlyConnections:
+    """Memoizes one read-only connection per database path"""
+
+    def __init__(self):
+        self._connections: Dict[str, sqlite3.Connection] = {}
+
+    def get(self, db_path: str) -> sqlite3.Connection:
+        """Return the memoized connection, opening it on first use"""
+        conn = self._connections.get(db_path)
+        if conn is None:
+            conn = connect_read_only(db_path)
+            self._connections[db_path] = conn
+        return conn
+
+    def close_all(self):
+        """Close every memoized connection"""
+        for conn in self._connections.values():
+            conn.close()
+        self._connections.clear()
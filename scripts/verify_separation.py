@@ -8,58 +8,137 @@ and analytics databases to ensure proper separation and data integrity.
 
 import sqlite3
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Tuple
+from fnmatch import fnmatchcase
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from create_analytics_db import FACT_PARTITION_GLOB, FACT_VIEW
+    from db_connections import ReadOnlyConnections, connect_read_only, read_only_uri
+except ImportError:  # Imported as scripts.verify_separation from the repository root
+    from scripts.create_analytics_db import FACT_PARTITION_GLOB, FACT_VIEW
+    from scripts.db_connections import ReadOnlyConnections, connect_read_only, read_only_uri
+
+def _quote_identifier(name: str) -> str:
+    """Quote a table name for interpolation into SQL"""
+    return '"' + name.replace('"', '""') + '"'
 
 class DatabaseHealthChecker:
     def __init__(self, operational_db: str, analytics_db: str):
         self.operational_db = operational_db
         self.analytics_db = analytics_db
+        self._readers = ReadOnlyConnections()
+        self._attached_conn: Optional[sqlite3.Connection] = None
+    
+    def _get_connection(self, db_path: str) -> sqlite3.Connection:
+        """Get a memoized read-only connection to the database"""
+        return self._readers.get(db_path)
+    
+    def _open_reader(self, db_path: str) -> sqlite3.Connection:
+        """Open a dedicated read-only connection usable from a worker thread"""
+        return connect_read_only(db_path, check_same_thread=False)
+    
+    def _get_attached_connection(self) -> sqlite3.Connection:
+        """Get a memoized in-memory connection with both databases attached read-only"""
+        if self._attached_conn is None:
+            conn = sqlite3.connect(':memory:', uri=True)
+            conn.execute("ATTACH DATABASE ? AS op", (read_only_uri(self.operational_db),))
+            conn.execute("ATTACH DATABASE ? AS an", (read_only_uri(self.analytics_db),))
+            self._attached_conn = conn
+        return self._attached_conn
+    
+    def close(self):
+        """Close all connections opened by the checker"""
+        self._readers.close_all()
+        if self._attached_conn is not None:
+            self._attached_conn.close()
+            self._attached_conn = None
         
     def check_database_exists(self, db_path: str) -> bool:
         """Check if database file exists and is accessible"""
         return os.path.exists(db_path) and os.path.getsize(db_path) > 0
     
-    def get_table_info(self, db_path: str) -> Dict:
+    def get_table_info(
+        self,
+        db_path: str,
+        conn: Optional[sqlite3.Connection] = None,
+        include_sizes: bool = False
+    ) -> Dict:
         """Get comprehensive table information from database"""
-        conn = sqlite3.connect(db_path)
+        conn = conn or self._get_connection(db_path)
         
-        # Get all tables
+        # Get all tables and views
         tables = conn.execute(
             "SELECT name FROM sqlite_master WHERE type='table'"
         ).fetchall()
         table_names = [t[0] for t in tables]
+        views = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='view'"
+        ).fetchall()
+        view_names = [v[0] for v in views]
         
-        # Get row counts
+        # Get row counts for all tables in a single statement
         table_counts = {}
-        for table in table_names:
+        if table_names:
+            count_sql = " UNION ALL ".join(
+                f"SELECT ? AS name, COUNT(*) AS n FROM {_quote_identifier(t)}"
+                for t in table_names
+            )
+            try:
+                table_counts = dict(conn.execute(count_sql, table_names).fetchall())
+            except Exception:
+                # Fall back to per-table counts so one bad table is reported on its own
+                for table in table_names:
+                    try:
+                        count = conn.execute(
+                            f"SELECT COUNT(*) FROM {_quote_identifier(table)}"
+                        ).fetchone()[0]
+                        table_counts[table] = count
+                    except Exception as e:
+                        table_counts[table] = f"Error: {e}"
+        
+        # On-disk bytes per table b-tree. Opt-in: dbstat walks every page of
+        # every b-tree even when aggregating, which costs far more than the counts
+        table_sizes = {}
+        if include_sizes and table_names:
+            placeholders = ", ".join("?" for _ in table_names)
             try:
-                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
-                table_counts[table] = count
-            except Exception as e:
-                table_counts[table] = f"Error: {e}"
+                table_sizes = dict(conn.execute(f"""
+                    SELECT name, pgsize FROM dbstat
+                    WHERE aggregate = TRUE AND name IN ({placeholders})
+                """, table_names).fetchall())
+            except sqlite3.OperationalError:
+                pass  # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
         
         # Get database size
         db_size = os.path.getsize(db_path)
         
-        conn.close()
-        
         return {
             'tables': table_names,
+            'views': view_names,
             'table_counts': table_counts,
+            'table_sizes': table_sizes,
             'total_tables': len(table_names),
             'db_size_mb': round(db_size / (1024 * 1024), 2)
         }
     
-    def verify_star_schema(self) -> Dict:
+    def verify_star_schema(
+        self,
+        conn: Optional[sqlite3.Connection] = None,
+        analytics_info: Optional[Dict] = None
+    ) -> Dict:
         """Verify STAR schema structure in analytics database"""
         required_tables = ['dim_vendors', 'dim_commodities', 'dim_time', 'fact_spend_analytics']
         
         if not self.check_database_exists(self.analytics_db):
             return {'status': 'FAILED', 'reason': 'Analytics database not found'}
         
-        analytics_info = self.get_table_info(self.analytics_db)
-        missing_tables = [t for t in required_tables if t not in analytics_info['tables']]
+        conn = conn or self._get_connection(self.analytics_db)
+        analytics_info = analytics_info or self.get_table_info(self.analytics_db, conn)
+        # fact_spend_analytics is a view over the monthly fact partitions
+        star_objects = analytics_info['tables'] + analytics_info['views']
+        missing_tables = [t for t in required_tables if t not in star_objects]
         
         if missing_tables:
             return {
@@ -68,33 +147,55 @@ class DatabaseHealthChecker:
             }
         
         # Check for fact table relationships
-        conn = sqlite3.connect(self.analytics_db)
         try:
-            # Verify foreign key relationships exist
+            # Partitions share the template's foreign keys; views have none
+            fact_table = (
+                'fact_spend_template' if 'fact_spend_template' in analytics_info['tables']
+                else 'fact_spend_analytics'
+            )
             fk_check = conn.execute(
-                "PRAGMA foreign_key_list(fact_spend_analytics)"
+                f"PRAGMA foreign_key_list({fact_table})"
             ).fetchall()
             
-            conn.close()
+            # The fact view's rows are the partition rows counted above
+            partition_counts = [
+                count for name, count in analytics_info['table_counts'].items()
+                if fnmatchcase(name, FACT_PARTITION_GLOB)
+            ]
+            
+            table_counts = {}
+            for t in required_tables:
+                if t in analytics_info['table_counts']:
+                    table_counts[t] = analytics_info['table_counts'][t]
+                elif (t == FACT_VIEW and fact_table == 'fact_spend_template'
+                      and all(isinstance(count, int) for count in partition_counts)):
+                    table_counts[t] = sum(partition_counts)
+                else:
+                    table_counts[t] = conn.execute(
+                        f"SELECT COUNT(*) FROM {_quote_identifier(t)}"
+                    ).fetchone()[0]
             
             return {
                 'status': 'PASSED',
                 'star_tables': required_tables,
                 'foreign_keys': len(fk_check),
-                'table_counts': {t: analytics_info['table_counts'][t] for t in required_tables}
+                'table_counts': table_counts
             }
         except Exception as e:
-            conn.close()
             return {'status': 'FAILED', 'reason': f'Schema validation error: {e}'}
     
-    def verify_operational_schema(self) -> Dict:
+    def verify_operational_schema(
+        self,
+        conn: Optional[sqlite3.Connection] = None,
+        operational_info: Optional[Dict] = None
+    ) -> Dict:
         """Verify operational database has required tables"""
         required_tables = ['vendors', 'spend_transactions', 'contracts', 'commodities']
         
         if not self.check_database_exists(self.operational_db):
             return {'status': 'FAILED', 'reason': 'Operational database not found'}
         
-        operational_info = self.get_table_info(self.operational_db)
+        operational_info = operational_info or self.get_table_info(self.operational_db, conn)
         missing_tables = [t for t in required_tables if t not in operational_info['tables']]
         
         if missing_tables:
@@ -110,23 +211,32 @@ class DatabaseHealthChecker:
             'table_counts': {t: operational_info['table_counts'][t] for t in required_tables}
         }
     
-    def check_data_consistency(self) -> Dict:
+    def check_data_consistency(self, conn: Optional[sqlite3.Connection] = None) -> Dict:
         """Check data consistency between operational and analytics databases"""
         try:
-            # Connect to both databases
-            op_conn = sqlite3.connect(self.operational_db)
-            an_conn = sqlite3.connect(self.analytics_db)
+            # One connection sees both databases as op.* and an.*
+            conn = conn or self._get_attached_connection()
             
-            # Check vendor counts
-            op_vendors = op_conn.execute("SELECT COUNT(*) FROM vendors").fetchone()[0]
-            an_vendors = an_conn.execute("SELECT COUNT(*) FROM dim_vendors").fetchone()[0]
+            # Vendor and transaction vs fact counts (facts may differ due to ETL processing)
+            op_vendors, an_vendors, op_transactions, an_facts, missing_vendor_count = conn.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM op.vendors),
+                    (SELECT COUNT(*) FROM an.dim_vendors),
+                    (SELECT COUNT(*) FROM op.spend_transactions),
+                    (SELECT COUNT(*) FROM an.fact_spend_analytics),
+                    (SELECT COUNT(*) FROM op.vendors v
+                     LEFT JOIN an.dim_vendors d ON d.vendor_id = v.vendor_id
+                     WHERE d.vendor_key IS NULL)
+            """).fetchone()
             
-            # Check transaction vs fact counts (may differ due to ETL processing)
-            op_transactions = op_conn.execute("SELECT COUNT(*) FROM spend_transactions").fetchone()[0]
-            an_facts = an_conn.execute("SELECT COUNT(*) FROM fact_spend_analytics").fetchone()[0]
-            
-            op_conn.close()
-            an_conn.close()
+            # Sample of operational vendors that never reached the dimension
+            missing_vendors = [row[0] for row in conn.execute("""
+                SELECT v.vendor_id FROM op.vendors v
+                LEFT JOIN an.dim_vendors d ON d.vendor_id = v.vendor_id
+                WHERE d.vendor_key IS NULL
+                ORDER BY v.vendor_id
+                LIMIT 20
+            """)] if missing_vendor_count else []
             
             vendor_consistency = abs(op_vendors - an_vendors) <= 10  # Allow small variance
             transaction_ratio = an_facts / op_transactions if op_transactions > 0 else 0
@@ -136,7 +246,9 @@ class DatabaseHealthChecker:
                 'vendor_counts': {'operational': op_vendors, 'analytics': an_vendors},
                 'transaction_counts': {'operational': op_transactions, 'analytics': an_facts},
                 'vendor_consistency': vendor_consistency,
-                'transaction_ratio': round(transaction_ratio, 3)
+                'transaction_ratio': round(transaction_ratio, 3),
+                'missing_vendor_count': missing_vendor_count,
+                'missing_vendors': missing_vendors
             }
         
         except Exception as e:
@@ -167,22 +279,30 @@ class DatabaseHealthChecker:
             results['reason'] = 'Database files missing'
             return results
         
-        # 2. Get database info
-        print("\n📊 Analyzing Database Structure...")
-        op_info = self.get_table_info(self.operational_db)
-        an_info = self.get_table_info(self.analytics_db)
+        # 2. Table scans only read, so run both databases concurrently,
+        # each on its own read-only connection
+        readers = [self._open_reader(db_path) for db_path in (self.operational_db, self.analytics_db)]
+        try:
+            with ThreadPoolExecutor(max_workers=len(readers)) as executor:
+                op_info_future = executor.submit(self.get_table_info, self.operational_db, readers[0])
+                an_info_future = executor.submit(self.get_table_info, self.analytics_db, readers[1])
+                op_info = op_info_future.result()
+                an_info = an_info_future.result()
+        finally:
+            for conn in readers:
+                conn.close()
         
+        print("\n📊 Analyzing Database Structure...")
         print(f"   Operational: {op_info['total_tables']} tables, {op_info['db_size_mb']}MB")
         print(f"   Analytics: {an_info['total_tables']} tables, {an_info['db_size_mb']}MB")
         
         results['operational_info'] = op_info
         results['analytics_info'] = an_info
         
-        # 3. Verify schemas
+        # 3. Verify schemas against the table info gathered above
         print("\n🏗️ Verifying Schema Structure...")
-        star_check = self.verify_star_schema()
-        operational_check = self.verify_operational_schema()
-        
+        star_check = self.verify_star_schema(analytics_info=an_info)
+        operational_check = self.verify_operational_schema(operational_info=op_info)
         print(f"   STAR Schema: {'✅ PASSED' if star_check['status'] == 'PASSED' else '❌ FAILED'}")
         print(f"   Operational Schema: {'✅ PASSED' if operational_check['status'] == 'PASSED' else '❌ FAILED'}")
         
@@ -201,6 +321,9 @@ class DatabaseHealthChecker:
         if consistency_check['status'] != 'FAILED':
             print(f"   Vendor Consistency: {'✅ GOOD' if consistency_check['vendor_consistency'] else '⚠️ WARNING'}")
             print(f"   Transaction Ratio: {consistency_check['transaction_ratio']} {'✅ GOOD' if consistency_check['transaction_ratio'] > 0.9 else '⚠️ WARNING'}")
+            if consistency_check['missing_vendor_count']:
+                print(f"   Missing Vendors: {consistency_check['missing_vendor_count']} "
+                      f"(e.g. {', '.join(consistency_check['missing_vendors'][:5])})")
         else:
             print(f"   ❌ FAILED: {consistency_check['reason']}")
         
@@ -234,7 +357,10 @@ def main():
     analytics_db = "/Users/myownip/db_dev/procurement_analytics.db"
     
     checker = DatabaseHealthChecker(operational_db, analytics_db)
-    results = checker.run_full_health_check()
+    try:
+        results = checker.run_full_health_check()
+    finally:
+        checker.close()
     
     # Optionally save results to file
     # import json
@@ -25,8 +25,9 @@ SELECT DISTINCT
     1 as is_current_record
 FROM vendors v
 LEFT JOIN supplier_profiles sp ON v.vendor_id = sp.vendor_id
+LEFT JOIN dim_vendors dv ON dv.vendor_id = v.vendor_id AND dv.is_current_record = 1
 WHERE v.is_active = 1
-  AND v.vendor_id NOT IN (SELECT vendor_id FROM dim_vendors WHERE is_current_record = 1);
+  AND dv.vendor_key IS NULL;
 
 -- Populate dim_commodities from operational commodities
 INSERT INTO dim_commodities (
@@ -46,8 +47,9 @@ SELECT DISTINCT
     1 as is_current_record
 FROM commodities c
 LEFT JOIN commodity_profiles cp ON c.commodity_id = cp.commodity_id
+LEFT JOIN dim_commodities dc ON dc.commodity_id = c.commodity_id AND dc.is_current_record = 1
 WHERE c.is_active = 1
-  AND c.commodity_id NOT IN (SELECT commodity_id FROM dim_commodities WHERE is_current_record = 1);
+  AND dc.commodity_key IS NULL;
 
 -- Populate dim_time for date range
 INSERT INTO dim_time (
@@ -93,19 +95,20 @@ SELECT DISTINCT
     CAST(STRFTIME('%W', date_actual) AS INTEGER) as week_of_year,
     CASE WHEN STRFTIME('%w', date_actual) IN ('0', '6') THEN 1 ELSE 0 END as is_weekend
 FROM date_series
-WHERE CAST(STRFTIME('%Y%m%d', date_actual) AS INTEGER) NOT IN (
-    SELECT time_key FROM dim_time
+WHERE NOT EXISTS (
+    SELECT 1 FROM dim_time dt
+    WHERE dt.time_key = CAST(STRFTIME('%Y%m%d', date_series.date_actual) AS INTEGER)
 );
 
 -- =====================================================
 -- FACT TABLE POPULATION QUERIES
 -- =====================================================
 
--- Populate fact_spend_analytics from operational spend_transactions
-INSERT INTO fact_spend_analytics (
-    vendor_key, commodity_key, time_key, spend_amount, transaction_count,
-    quantity, unit_price, source_transaction_id, load_date
-)
+-- fact_spend_analytics is a read-only view over the monthly fact_spend_YYYYMM
+-- partitions. These queries select the candidate fact rows, and scripts/database_etl.py
+-- inserts them into the partition for each row's month.
+
+-- Fact rows for operational spend_transactions not yet loaded
 SELECT 
     dv.vendor_key,
     dc.commodity_key,
@@ -114,17 +117,14 @@ SELECT
     1 as transaction_count,
     st.quantity,
     st.unit_price,
-    CAST(st.transaction_id AS TEXT) as source_transaction_id,
+    st.transaction_id as source_transaction_id,
     DATE('now') as load_date
 FROM spend_transactions st
 JOIN dim_vendors dv ON st.vendor_id = dv.vendor_id AND dv.is_current_record = 1
 JOIN dim_commodities dc ON st.commodity_id = dc.commodity_id AND dc.is_current_record = 1
 JOIN dim_time dt ON dt.time_key = CAST(STRFTIME('%Y%m%d', st.transaction_date) AS INTEGER)
-WHERE st.transaction_id NOT IN (
-    SELECT CAST(source_transaction_id AS INTEGER)
-    FROM fact_spend_analytics 
-    WHERE source_transaction_id IS NOT NULL
-);
+LEFT JOIN fact_spend_analytics f ON f.source_transaction_id = st.transaction_id
+WHERE f.fact_key IS NULL;
 
 -- =====================================================
 -- INCREMENTAL ETL QUERIES
@@ -172,11 +172,7 @@ WHERE vendor_id IN (
 AND effective_start_date < DATE('now')
 AND is_current_record = 1;
 
--- Incremental fact table updates (daily)
-INSERT INTO fact_spend_analytics (
-    vendor_key, commodity_key, time_key, spend_amount, transaction_count,
-    quantity, unit_price, source_transaction_id, load_date
-)
+-- Incremental fact rows (daily)
 SELECT 
     dv.vendor_key,
     dc.commodity_key,
@@ -185,18 +181,15 @@ SELECT
     1,
     st.quantity,
     st.unit_price,
-    CAST(st.transaction_id AS TEXT),
+    st.transaction_id,
     DATE('now')
 FROM spend_transactions st
 JOIN dim_vendors dv ON st.vendor_id = dv.vendor_id AND dv.is_current_record = 1
 JOIN dim_commodities dc ON st.commodity_id = dc.commodity_id AND dc.is_current_record = 1
 JOIN dim_time dt ON dt.time_key = CAST(STRFTIME('%Y%m%d', st.transaction_date) AS INTEGER)
+LEFT JOIN fact_spend_analytics f ON f.source_transaction_id = st.transaction_id
 WHERE st.transaction_date >= DATE('now', '-7 days')  -- Last week's transactions
-  AND st.transaction_id NOT IN (
-    SELECT CAST(source_transaction_id AS INTEGER)
-    FROM fact_spend_analytics 
-    WHERE source_transaction_id IS NOT NULL
-  );
+  AND f.fact_key IS NULL;
 
 -- =====================================================
 -- DATA QUALITY AND RECONCILIATION QUERIES
@@ -276,7 +269,7 @@ WHERE dv.vendor_key IS NULL
 ANALYZE dim_vendors;
 ANALYZE dim_commodities;
 ANALYZE dim_time;
-ANALYZE fact_spend_analytics;
+-- Fact partitions are analyzed by the ETL after each load
 
 -- Vacuum to reclaim space
 -- Note: Run these during maintenance windows
@@ -128,6 +128,7 @@ CREATE TABLE spend_transactions (
     fiscal_year INTEGER,
     fiscal_quarter INTEGER,
     created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    time_key INTEGER GENERATED ALWAYS AS (CAST(STRFTIME('%Y%m%d', award_date) AS INTEGER)) STORED,
     FOREIGN KEY (vendor_id) REFERENCES vendors(vendor_id),
     FOREIGN KEY (commodity_id) REFERENCES commodities(commodity_id),
     FOREIGN KEY (contract_id) REFERENCES contracts(contract_id),
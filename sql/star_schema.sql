@@ -3,7 +3,9 @@
 -- =====================================================
 
 -- Drop tables if they exist (for clean recreation)
-DROP TABLE IF EXISTS fact_spend_analytics;
+-- Monthly fact_spend_YYYYMM partitions are not listed here; recreate the database to drop them
+DROP VIEW IF EXISTS fact_spend_analytics;
+DROP TABLE IF EXISTS fact_spend_template;
 DROP TABLE IF EXISTS dim_vendors;
 DROP TABLE IF EXISTS dim_commodities;
 DROP TABLE IF EXISTS dim_time;
@@ -110,14 +112,17 @@ CREATE TABLE dim_business_units (
 -- =====================================================
 
 -- Main Spend Analytics Fact Table
-CREATE TABLE fact_spend_analytics (
+-- Template for the monthly fact_spend_YYYYMM partitions. The ETL creates each
+-- partition from this definition (scripts/create_analytics_db.py) and rebuilds
+-- the fact_spend_analytics view over all of them.
+CREATE TABLE fact_spend_template (
     fact_key INTEGER PRIMARY KEY,
     
     -- Foreign Keys to Dimensions
     vendor_key INTEGER NOT NULL,
     commodity_key INTEGER NOT NULL,
     contract_key INTEGER,
-    time_key INTEGER NOT NULL,
+    time_key INTEGER NOT NULL CHECK(time_key >= 20090101 AND time_key <= 99991231),
     business_unit_key INTEGER,
     
     -- Spend Metrics
@@ -147,7 +152,7 @@ CREATE TABLE fact_spend_analytics (
     payment_delay_days INTEGER,
     
     -- Audit Trail
-    source_transaction_id TEXT,
+    source_transaction_id INTEGER,
     source_system TEXT,
     load_date DATE NOT NULL,
     load_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -160,6 +165,10 @@ CREATE TABLE fact_spend_analytics (
     FOREIGN KEY (business_unit_key) REFERENCES dim_business_units(business_unit_key)
 );
 
+-- Read path over the template and every monthly partition
+CREATE VIEW fact_spend_analytics AS
+SELECT * FROM fact_spend_template;
+
 -- Supplier Performance Fact Table (Future Enhancement)
 CREATE TABLE fact_supplier_performance (
     performance_key INTEGER PRIMARY KEY,
@@ -237,15 +246,8 @@ CREATE INDEX idx_dim_time_date ON dim_time(date_actual);
 CREATE INDEX idx_dim_time_fiscal ON dim_time(fiscal_year, fiscal_quarter);
 
 -- Fact Table Indexes
-CREATE INDEX idx_fact_spend_vendor ON fact_spend_analytics(vendor_key);
-CREATE INDEX idx_fact_spend_commodity ON fact_spend_analytics(commodity_key);
-CREATE INDEX idx_fact_spend_time ON fact_spend_analytics(time_key);
-CREATE INDEX idx_fact_spend_date ON fact_spend_analytics(load_date);
-CREATE INDEX idx_fact_spend_amount ON fact_spend_analytics(spend_amount);
-
--- Composite Indexes for Common Queries
-CREATE INDEX idx_fact_spend_vendor_time ON fact_spend_analytics(vendor_key, time_key);
-CREATE INDEX idx_fact_spend_commodity_time ON fact_spend_analytics(commodity_key, time_key);
+-- Each fact_spend_YYYYMM partition gets its own source_transaction_id, vendor_key
+-- and time_key indexes when the ETL creates it (see index_partition)
 
 -- =====================================================
 -- VIEWS FOR COMMON REPORTING
@@ -292,23 +294,8 @@ ORDER BY total_spend DESC;
 -- DATA QUALITY CONSTRAINTS
 -- =====================================================
 
--- Ensure time keys are properly formatted (YYYYMMDD)
-CREATE TRIGGER trg_validate_time_key
-BEFORE INSERT ON fact_spend_analytics
-FOR EACH ROW
-WHEN NEW.time_key < 20090101 OR NEW.time_key > 99991231
-BEGIN
-    SELECT RAISE(ABORT, 'Invalid time_key format. Must be YYYYMMDD.');
-END;
-
--- Ensure no negative spend amounts
-CREATE TRIGGER trg_validate_spend_amount
-BEFORE INSERT ON fact_spend_analytics
-FOR EACH ROW
-WHEN NEW.spend_amount < 0
-BEGIN
-    SELECT RAISE(ABORT, 'Spend amount cannot be negative.');
-END;
+-- Fact time keys (YYYYMMDD) and spend amounts are enforced by CHECK constraints
+-- on fact_spend_template, which every partition inherits
 
 -- Auto-update timestamps
 CREATE TRIGGER trg_update_vendor_timestamp
@@ -0,0 +1,137 @@
+"""
+Shared fixtures: throwaway operational and analytics databases.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from scripts.create_analytics_db import FACT_TABLE_DDL, FACT_VIEW, create_schema
+from scripts.database_etl import SeparateDatabaseETL
+
+# (transaction_id, vendor_id, commodity_id, award_date, total_amount)
+TRANSACTIONS = [
+    (1, 'V1', 'C1', '2024-01-05', 100.0),
+    (2, 'V1', 'C2', '2024-01-20', 250.0),
+    (3, 'V2', 'C1', '2024-02-11', 75.5),
+    (4, 'V2', 'C2', '2024-02-28', 40.0),
+]
+
+def _seed_dimensions(conn: sqlite3.Connection):
+    """Commodities and a 2024 calendar; vendors are loaded by the ETL upsert"""
+    conn.executemany(
+        "INSERT INTO dim_commodities (commodity_id, is_current_record) VALUES (?, 1)",
+        [('C1',), ('C2',)]
+    )
+    conn.execute("""
+        WITH RECURSIVE days(d) AS (
+            SELECT DATE('2024-01-01')
+            UNION ALL
+            SELECT DATE(d, '+1 day') FROM days WHERE d < '2024-12-31'
+        )
+        INSERT INTO dim_time (time_key, date_actual)
+        SELECT CAST(STRFTIME('%Y%m%d', d) AS INTEGER), d FROM days
+    """)
+
+@pytest.fixture
+def operational_db(tmp_path) -> str:
+    """Operational database built from sql/operational_schema.sql"""
+    path = str(tmp_path / "procurement_operational.db")
+    conn = sqlite3.connect(path)
+    conn.executescript((REPO_ROOT / "sql" / "operational_schema.sql").read_text())
+    conn.executemany(
+        "INSERT INTO vendors (vendor_id, vendor_name, vendor_tier, country) VALUES (?, ?, 'Approved', 'US')",
+        [('V1', 'Vendor One'), ('V2', 'Vendor Two')]
+    )
+    conn.executemany(
+        "INSERT INTO commodities (commodity_id, commodity_description) VALUES (?, ?)",
+        [('C1', 'Office Supplies'), ('C2', 'IT Services')]
+    )
+    conn.executemany("""
+        INSERT INTO spend_transactions (
+            transaction_id, vendor_id, commodity_id, transaction_date, award_date, total_amount
+        ) VALUES (?, ?, ?, '2024-01-01', ?, ?)
+    """, TRANSACTIONS)
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.fixture
+def analytics_db(tmp_path) -> str:
+    """Analytics database in the current partitioned layout"""
+    path = str(tmp_path / "procurement_analytics.db")
+    conn = sqlite3.connect(path)
+    create_schema(conn)
+    _seed_dimensions(conn)
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.fixture
+def legacy_analytics_db(tmp_path) -> str:
+    """Analytics database in the single-table layout, with TEXT source ids and a dependent view"""
+    path = str(tmp_path / "procurement_analytics.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(f"""
+        CREATE TABLE dim_vendors (
+            vendor_key INTEGER PRIMARY KEY, vendor_id TEXT, vendor_name TEXT, vendor_tier TEXT,
+            diversity_classification TEXT, risk_rating TEXT, esg_score REAL, country TEXT,
+            region TEXT, effective_start_date DATE, effective_end_date DATE,
+            is_current_record BOOLEAN
+        );
+        CREATE TABLE dim_commodities (
+            commodity_key INTEGER PRIMARY KEY, commodity_id TEXT, commodity_description TEXT,
+            parent_category TEXT, sub_category TEXT, business_criticality TEXT,
+            sourcing_complexity TEXT, category_manager TEXT, effective_start_date DATE,
+            is_current_record BOOLEAN
+        );
+        CREATE TABLE dim_time (
+            time_key INTEGER PRIMARY KEY, date_actual DATE, year INTEGER, quarter INTEGER,
+            month INTEGER, fiscal_year INTEGER, fiscal_quarter INTEGER, month_name TEXT,
+            quarter_name TEXT, day_of_week TEXT, week_of_year INTEGER
+        );
+        {FACT_TABLE_DDL.format(table=FACT_VIEW).replace(
+            "source_transaction_id INTEGER", "source_transaction_id TEXT"
+        )}
+        CREATE VIEW vw_spend_by_vendor AS
+            SELECT vendor_key, SUM(spend_amount) AS total_spend
+            FROM fact_spend_analytics GROUP BY vendor_key;
+    """)
+    _seed_dimensions(conn)
+    conn.executemany(
+        "INSERT INTO dim_vendors (vendor_id, vendor_name, is_current_record) VALUES (?, ?, 1)",
+        [('V1', 'Vendor One'), ('V2', 'Vendor Two')]
+    )
+    # The first three transactions were loaded by the old ETL
+    conn.executemany("""
+        INSERT INTO fact_spend_analytics (
+            vendor_key, commodity_key, time_key, spend_amount, transaction_count,
+            source_transaction_id, load_date
+        )
+        SELECT dv.vendor_key, dc.commodity_key, CAST(STRFTIME('%Y%m%d', ?) AS INTEGER),
+               ?, 1, CAST(? AS TEXT), '2024-06-01'
+        FROM dim_vendors dv, dim_commodities dc
+        WHERE dv.vendor_id = ? AND dc.commodity_id = ?
+    """, [
+        (award_date, amount, tx_id, vendor_id, commodity_id)
+        for tx_id, vendor_id, commodity_id, award_date, amount in TRANSACTIONS[:3]
+    ])
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.fixture
+def run_etl(operational_db):
+    """Run one daily_etl() pass against the operational database and a given analytics database"""
+    def _run(analytics_path: str):
+        etl = SeparateDatabaseETL(operational_db=operational_db, analytics_db=analytics_path)
+        try:
+            etl.daily_etl()
+        finally:
+            etl.close()
+    return _run
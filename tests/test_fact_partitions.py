@@ -0,0 +1,87 @@
+"""
+Monthly fact partitions: legacy migration, idempotent reruns and award-date moves.
+"""
+
+import sqlite3
+
+from conftest import TRANSACTIONS
+
+def _query(db_path: str, sql: str, params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+def _facts(db_path: str):
+    """(source_transaction_id, time_key) of every fact, in transaction order"""
+    return _query(db_path, """
+        SELECT source_transaction_id, time_key FROM fact_spend_analytics
+        ORDER BY source_transaction_id
+    """)
+
+def _tables(db_path: str):
+    return {name for (name,) in _query(
+        db_path, "SELECT name FROM sqlite_master WHERE type = 'table'"
+    )}
+
+def test_migrates_legacy_fact_table(legacy_analytics_db, run_etl):
+    legacy_spend = dict(_query(legacy_analytics_db, "SELECT * FROM vw_spend_by_vendor"))
+
+    run_etl(legacy_analytics_db)
+
+    assert _query(
+        legacy_analytics_db,
+        "SELECT type FROM sqlite_master WHERE name = 'fact_spend_analytics'"
+    ) == [('view',)]
+    assert {'fact_spend_202401', 'fact_spend_202402'} <= _tables(legacy_analytics_db)
+
+    # TEXT source ids were converted, so the loaded three are not reloaded
+    assert _query(
+        legacy_analytics_db,
+        "SELECT DISTINCT typeof(source_transaction_id) FROM fact_spend_analytics"
+    ) == [('integer',)]
+    assert [tx_id for tx_id, _ in _facts(legacy_analytics_db)] == [1, 2, 3, 4]
+
+    # Views over the old table now read the partition view
+    spend = dict(_query(legacy_analytics_db, "SELECT * FROM vw_spend_by_vendor"))
+    vendor_two = next(key for key, total in legacy_spend.items() if total == 75.5)
+    assert spend[vendor_two] == 75.5 + 40.0
+
+    assert _query(
+        legacy_analytics_db, "SELECT COUNT(*) FROM fact_spend_sources"
+    ) == [(len(TRANSACTIONS),)]
+
+def test_rerun_loads_nothing_new(analytics_db, run_etl):
+    run_etl(analytics_db)
+    first_run = _query(analytics_db, "SELECT * FROM fact_spend_analytics ORDER BY fact_key")
+
+    run_etl(analytics_db)
+
+    assert len(first_run) == len(TRANSACTIONS)
+    assert _query(analytics_db, "SELECT * FROM fact_spend_analytics ORDER BY fact_key") == first_run
+
+def test_changed_award_date_moves_fact(analytics_db, operational_db, run_etl):
+    run_etl(analytics_db)
+    assert 'fact_spend_202412' not in _tables(analytics_db)
+
+    conn = sqlite3.connect(operational_db)
+    conn.execute("UPDATE spend_transactions SET award_date = '2024-12-03' WHERE transaction_id = 1")
+    conn.execute("UPDATE spend_transactions SET award_date = '2024-02-14' WHERE transaction_id = 2")
+    conn.commit()
+    conn.close()
+
+    run_etl(analytics_db)
+
+    assert _facts(analytics_db) == [
+        (1, 20241203), (2, 20240214), (3, 20240211), (4, 20240228)
+    ]
+    assert _query(analytics_db, "SELECT COUNT(*) FROM fact_spend_202401") == [(0,)]
+    assert _query(
+        analytics_db, "SELECT source_transaction_id FROM fact_spend_202412"
+    ) == [(1,)]
+    assert _query(
+        analytics_db,
+        "SELECT time_key FROM fact_spend_sources WHERE source_transaction_id IN (1, 2) "
+        "ORDER BY source_transaction_id"
+    ) == [(20241203,), (20240214,)]